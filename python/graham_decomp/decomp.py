@@ -5,7 +5,10 @@
 #   decomp.py - Graham Decomposition of Concave Polygons
 ##
 
+import math
+
 from graham_decomp.earclip import avg_ear_clipping
+from graham_decomp.polygon import Polygon, signed_area
 from graham_decomp import sorted
 
 #   Graham Decomposition
@@ -38,16 +41,16 @@ def graham_decomposition(polygon, pivot=None, root=None, triangulate=True, r=0):
     # Map reflex vertices on path
     # This might seem like a duplicate of polygon.reflexes, however
     # it is necessary on recursive steps to avoind creating a whole
-    # new Polygon object
+    # new Polygon object.
+    # On recursive steps, the subpolygon is a closed ring, so it's walked
+    # instead of polygon.reflexes: vertices already sliced out of it may
+    # still be there, and a vertex may be reflex on one ring but not the other.
     reflexes = []
     it = pivot
     while (True):
-        if (it == root): break
-        # Add to list
-        reflexes.insert(0, it)
-        # (On a linked list this is more straight-forward, just use "prev")
-        it = polygon.reflexes[polygon.reflexes.index(it)-1]
-        # If reached pivot (loop end) or last pivot (open end)
+        it = it.next
+        if (it.area < 0 or it == pivot):
+            reflexes.append(it)
         if (it == pivot): break
 
     # While there's a pivot (reflex vertex)
@@ -70,8 +73,10 @@ def graham_decomposition(polygon, pivot=None, root=None, triangulate=True, r=0):
                 # (On a linked list this is more straight-forward, just use "next")
                 it = reflexes[(reflexes.index(it)+1)%len(reflexes)]
                 # If reflex is above the pivot edge, map it
+                # (or behind pivot, where a 180 degree subpolygon closes)
                 reflex_diag = it.pos-pivot.pos
-                if (pivot_edge.cross(reflex_diag) < 0):
+                cross = pivot_edge.cross(reflex_diag)
+                if (cross < 0 or (cross == 0 and pivot_edge.dot(reflex_diag) < 0)):
                     sorted.insert_graham(in_reflexes, it, pivot_edge.angle(reflex_diag))
                 # If reached pivot, break
                 if (it == pivot): break
@@ -93,14 +98,20 @@ def graham_decomposition(polygon, pivot=None, root=None, triangulate=True, r=0):
                 slice = it
                 convex = True
                 break
-            # Calculate edge graham angle
-            graham_angle = diag.angle(pivot_edge)
             # Remove from in_reflexes vertices that are outside the edge (it -> it.next)
-            in_reflexes = [reflex for reflex in in_reflexes if ((it.next.pos - it.pos).cross(reflex[0].pos-it.pos) < 0)]
-            # If a reflex was found inside the subpolygon
-            # relink polygon and do recursion
-            if (len(in_reflexes) and in_reflexes[0][1] < graham_angle):
-                slice = in_reflexes[0][0]
+            # (unless the edge is in line with pivot, then it has no outside)
+            edge = it.next.pos - it.pos
+            if (edge.cross(pivot.pos-it.pos) != 0):
+                in_reflexes = [reflex for reflex in in_reflexes if (edge.cross(reflex[0].pos-it.pos) < 0)]
+            # If a reflex was found inside the subpolygon (or on the diagonal)
+            # relink polygon and do recursion.
+            # Its graham angle is compared with a cross product, which is exact
+            # for reflexes on the diagonal, unlike the normalized angles
+            if (len(in_reflexes)):
+                reflex_diag = in_reflexes[0][0].pos-pivot.pos
+                cross = diag.cross(reflex_diag)
+                if (cross > 0 or (cross == 0 and diag.dot(reflex_diag) > 0)):
+                    slice = in_reflexes[0][0]
 
         # Store to relink later
         prev = pivot.prev
@@ -174,13 +185,11 @@ def graham_decomposition(polygon, pivot=None, root=None, triangulate=True, r=0):
         # If sliced a convex subpolygon, the reflex vertices can
         # be removed from the list if they are no longer reflex
         if (convex):
-            if (slice_reflex and slice.area > 0):
+            if (slice_reflex and slice.area >= 0):
                 reflexes.remove(slice)
-                polygon.reflexes.remove(slice)
             new_pivot = reflexes[(reflexes.index(pivot)+1)%len(reflexes)]
-            if (pivot_reflex and pivot.area > 0):
+            if (pivot_reflex and pivot.area >= 0):
                 reflexes.remove(pivot)
-                polygon.reflexes.remove(pivot)
         # If it's concave, remove a subset of the list.
         else:
             new_pivot = reflexes[(reflexes.index(slice)+1)%len(reflexes)]
@@ -189,27 +198,15 @@ def graham_decomposition(polygon, pivot=None, root=None, triangulate=True, r=0):
             i_slice = reflexes.index(slice)
             if (i_pivot < i_slice):
                 if (pivot.area < 0): i_pivot += 1
-                if (slice.area > 0): i_slice += 1
+                if (slice.area >= 0): i_slice += 1
                 reflexes = reflexes[:i_pivot] + reflexes[i_slice:]
             else:
                 if (pivot.area < 0): i_pivot += 1
-                if (slice.area > 0): i_slice += 1
+                if (slice.area >= 0): i_slice += 1
                 reflexes = reflexes[i_slice:i_pivot]
-            # Remove section of polygon reflex list (on a linked list this is way more straight-forward)
-            if (r == 0 and not r_pivot):
-                i_p_pivot = polygon.reflexes.index(pivot)
-                i_p_slice = polygon.reflexes.index(slice)
-                if (i_p_pivot < i_p_slice):
-                    if (pivot.area < 0): i_p_pivot += 1
-                    if (slice.area > 0): i_p_slice += 1
-                    polygon.reflexes = polygon.reflexes[:i_p_pivot] + polygon.reflexes[i_p_slice:]
-                else:
-                    if (pivot.area < 0): i_p_pivot += 1
-                    if (slice.area > 0): i_p_slice += 1
-                    polygon.reflexes = polygon.reflexes[i_p_slice:i_p_pivot]
 
         # If reached end, save starting point
-        if (new_pivot == pivot and pivot.area > 0):
+        if (new_pivot == pivot and pivot.area >= 0):
             reflexes = []
         # If not, advance to next pivot
         else:
@@ -227,3 +224,53 @@ def graham_decomposition(polygon, pivot=None, root=None, triangulate=True, r=0):
     subpolygons.append(polygon.subpolygon(pivot))
     if (r==0): polygon.reset()
     return subpolygons
+
+#   Validate Polygon
+#   Raises ValueError on input graham_decomposition can't handle:
+#   less than 3 vertices, non-finite or repeated vertices and zero area.
+#   Returns the signed area (doubled).
+#   Self-intersections aren't detected, it would take O(n^2).
+
+def validate_polygon(points):
+    if (len(points) < 3):
+        raise ValueError("polygon with %d vertices" % len(points))
+    for p in range(len(points)):
+        if (not math.isfinite(points[p][0]) or not math.isfinite(points[p][1])):
+            raise ValueError("non-finite vertex %d" % p)
+        if (points[p-1][0] == points[p][0] and points[p-1][1] == points[p][1]):
+            raise ValueError("repeated vertex %d" % p)
+    area = signed_area(points)
+    if (area == 0):
+        raise ValueError("polygon with zero area")
+    return area
+
+#   Indexed Graham Decomposition
+#   Triangulates a list of points, returning triangles as tuples
+#   of indices on the list (cheap to send between processes).
+#   Points may come in either orientation, they're reversed if needed.
+#   Raises ValueError on degenerate input, or if the result
+#   isn't a triangulation of the polygon.
+
+def indexed_decomposition(points):
+    area = validate_polygon(points)
+
+    # Orient so convex vertices have positive area
+    n = len(points)
+    reverse = area < 0
+    if (reverse):
+        points = points[::-1]
+
+    polygon = Polygon(points)
+    index = {id(vertex): i for i, vertex in enumerate(polygon.vertices)}
+    triangles = [(index[id(t.a)], index[id(t.b)], index[id(t.c)]) for t in graham_decomposition(polygon)]
+
+    # Validate: n-2 triangles covering the whole polygon
+    total = 0
+    for a, b, c in triangles:
+        total += abs((polygon.vertices[b].pos-polygon.vertices[a].pos).cross(polygon.vertices[c].pos-polygon.vertices[a].pos))/2
+    if (len(triangles) != n-2 or abs(total-polygon.area) > 1e-9*polygon.area):
+        raise ValueError("decomposition is not a triangulation")
+
+    if (reverse):
+        triangles = [(n-1-a, n-1-b, n-1-c) for a, b, c in triangles]
+    return triangles
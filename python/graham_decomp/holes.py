@@ -0,0 +1,296 @@
+##
+#   Graham Decomposition of Polygons
+#   https://github.com/hugoaboud/graham-polygon-decomposition
+#
+#   holes.py - Polygons with Holes, Bridge Insertion
+##
+
+import bisect, math
+
+from graham_decomp.vector import Vector
+from graham_decomp.polygon import Vertex, Polygon, signed_area
+
+#   Linked Ring
+#   Creates a doubly-linked circular list of Vertex from a list of points
+
+def _ring(points):
+    vertices = [Vertex(point) for point in points]
+    for v in range(len(vertices)):
+        vertices[v].prev = vertices[v-1]
+        vertices[v-1].next = vertices[v]
+    return vertices
+
+#   In Cone
+#   Checks if the direction (vertex -> p) is inside the polygon,
+#   that is, between the edges of vertex
+
+def _in_cone(vertex, p):
+    prev = vertex.prev.pos-vertex.pos
+    next = vertex.next.pos-vertex.pos
+    diag = p-vertex.pos
+    # Convex vertex: diagonal must be strictly inside the wedge
+    if (prev.cross(next) >= 0):
+        return prev.cross(diag) > 0 and diag.cross(next) > 0
+    # Reflex vertex: diagonal must not be inside the outer wedge
+    return not (next.cross(diag) >= 0 and diag.cross(prev) >= 0)
+
+#   In Triangle (inclusive, any orientation)
+
+def _in_triangle(a, b, c, p):
+    d1 = (b-a).cross(p-a)
+    d2 = (c-b).cross(p-b)
+    d3 = (a-c).cross(p-c)
+    return not ((d1 < 0 or d2 < 0 or d3 < 0) and (d1 > 0 or d2 > 0 or d3 > 0))
+
+#   Wedge Angle
+#   Direction from vertex to its prev: the wedge inside the polygon
+#   goes counter-clockwise (positive cross) from there to the direction of next
+
+def _wedge(vertex):
+    return math.atan2(vertex.prev.pos.y-vertex.pos.y, vertex.prev.pos.x-vertex.pos.x)
+
+#   Edge Grid
+#   Uniform grid over the polygon bounding box, where each vertex is
+#   stored on every cell crossed by its edge (vertex -> next).
+#   Edges are read from the linked list at query time, so relinking a vertex
+#   only requires inserting it again (stale cells just cost an extra test).
+#   Positions are stored once, on the cell they fall in, with every copy
+#   of the position (bridge endpoints) sorted by wedge angle.
+
+class _Grid:
+
+    def __init__(self, points):
+        self.x0 = min(p[0] for p in points)
+        self.y0 = min(p[1] for p in points)
+        self.size = max(1, math.ceil(math.sqrt(len(points))))
+        width = max(p[0] for p in points)-self.x0
+        height = max(p[1] for p in points)-self.y0
+        self.w = (width or 1)/self.size
+        self.h = (height or 1)/self.size
+        self.cells = {}
+        self.points = {}
+        self.copies = {}
+
+    def col(self, x):
+        return min(self.size-1, max(0, int((x-self.x0)/self.w)))
+
+    def row(self, y):
+        return min(self.size-1, max(0, int((y-self.y0)/self.h)))
+
+    #   Insert Edge
+    #   Walks the cells crossed by the edge, stepping
+    #   to the nearest column or row boundary (DDA)
+
+    def insert(self, vertex):
+        a = vertex.pos
+        b = vertex.next.pos
+        col, row = self.col(a.x), self.row(a.y)
+        end = (self.col(b.x), self.row(b.y))
+        dx = b.x-a.x
+        dy = b.y-a.y
+        # Position along the edge (0 to 1) of the next column and row boundaries
+        t_col = (self.x0+(col+(dx > 0))*self.w-a.x)/dx if (dx) else math.inf
+        t_row = (self.y0+(row+(dy > 0))*self.h-a.y)/dy if (dy) else math.inf
+        dt_col = self.w/abs(dx) if (dx) else math.inf
+        dt_row = self.h/abs(dy) if (dy) else math.inf
+        while (True):
+            self.cells.setdefault((col,row), []).append(vertex)
+            if ((col,row) == end or min(t_col, t_row) > 1): break
+            if (t_col < t_row):
+                col += 1 if (dx > 0) else -1
+                t_col += dt_col
+            else:
+                row += 1 if (dy > 0) else -1
+                t_row += dt_row
+            if (not (0 <= col < self.size and 0 <= row < self.size)): break
+        # Rounding may stop the walk short of the last cell
+        if ((col,row) != end):
+            self.cells.setdefault(end, []).append(vertex)
+
+    #   Add Vertex
+    #   Stores a vertex with the other copies of its position,
+    #   its prev must not change direction afterwards
+
+    def add(self, vertex):
+        key = (vertex.pos.x, vertex.pos.y)
+        if (key not in self.copies):
+            self.copies[key] = []
+            self.points.setdefault((self.col(key[0]), self.row(key[1])), []).append(key)
+        bisect.insort(self.copies[key], (_wedge(vertex), id(vertex), vertex))
+
+    #   Sector
+    #   Copy of the position key whose wedge contains the direction to p,
+    #   the last wedge starting before it (wrapping around)
+
+    def sector(self, key, p):
+        copies = self.copies[key]
+        if (len(copies) == 1):
+            return copies[0][2]
+        angle = math.atan2(p.y-key[1], p.x-key[0])
+        vertex = copies[bisect.bisect_right(copies, (angle, math.inf))-1][2]
+        if (_in_cone(vertex, p)):
+            return vertex
+        # Direction along a wedge edge
+        for _, _, copy in copies:
+            if (_in_cone(copy, p)):
+                return copy
+        return vertex
+
+    #   Triangle Query
+    #   Positions on the cells overlapping the triangle abc, walking
+    #   its span on each row (with one cell of margin for rounding)
+
+    def triangle(self, a, b, c):
+        y0 = min(a.y, b.y, c.y)
+        y1 = max(a.y, b.y, c.y)
+        for row in range(self.row(y0), self.row(y1)+1):
+            top = max(y0, self.y0+row*self.h)
+            bottom = min(y1, self.y0+(row+1)*self.h)
+            xs = [p.x for p in (a,b,c) if (top <= p.y <= bottom)]
+            for p, q in ((a,b), (b,c), (c,a)):
+                if (p.y == q.y): continue
+                for y in (top, bottom):
+                    if (min(p.y,q.y) <= y <= max(p.y,q.y)):
+                        xs.append(p.x + (y-p.y)*(q.x-p.x)/(q.y-p.y))
+            if (not xs): continue
+            for col in range(max(0, self.col(min(xs))-1), min(self.size, self.col(max(xs))+2)):
+                yield from self.points.get((col,row), ())
+
+#   Ray Cast
+#   Finds the nearest edge hit by a ray from m towards +x,
+#   walking the grid row of m from left to right.
+#   Returns the hit x coordinate and the edge vertex with larger x.
+
+def _ray_cast(grid, m):
+    best = None
+    best_x = math.inf
+    row = grid.row(m.y)
+    for col in range(grid.col(m.x), grid.size):
+        for vertex in grid.cells.get((col,row), ()):
+            a = vertex.pos
+            b = vertex.next.pos
+            # Horizontal edges are hit through their neighbours
+            if (a.y == b.y or m.y < min(a.y,b.y) or m.y > max(a.y,b.y)): continue
+            x = a.x + (m.y-a.y)*(b.x-a.x)/(b.y-a.y)
+            if (x < m.x or x > best_x): continue
+            candidate = vertex if (a.x > b.x) else vertex.next
+            # On ties, keep the edge vertex closer to the ray
+            if (x == best_x and abs(candidate.pos.y-m.y) >= abs(best.pos.y-m.y)): continue
+            best = candidate
+            best_x = x
+        # Cells to the right can't hold a closer hit
+        if (best and best_x < grid.x0+(col+1)*grid.w): break
+    return best, best_x
+
+#   Bridge Vertex
+#   Finds a vertex of the outer ring visible from the hole vertex m.
+#   Vertices already bridged have copies on the same position,
+#   the copy whose wedge contains the direction to m is returned.
+
+def _find_bridge(grid, m):
+    p, x = _ray_cast(grid, m.pos)
+    if (not p):
+        raise ValueError("hole is not inside the polygon")
+    key = (p.pos.x, p.pos.y)
+
+    # Ray hits a vertex, it's visible
+    if (p.pos.y == m.pos.y and p.pos.x == x):
+        return grid.sector(key, m.pos)
+
+    # Otherwise, p is visible unless a reflex vertex is inside
+    # the triangle (m, i, p). In that case, the reflex vertex with
+    # the smallest angle to the ray is visible.
+    i = Vector(x, m.pos.y)
+    best = key
+    best_tan = math.inf
+    for position in grid.triangle(m.pos, i, p.pos):
+        if (position == key or position[0] <= m.pos.x): continue
+        if (not _in_triangle(m.pos, i, p.pos, Vector(*position))): continue
+        vertex = grid.sector(position, m.pos)
+        vertex.update_area()
+        if (vertex.area >= 0 or not _in_cone(vertex, m.pos)): continue
+        tan = abs(position[1]-m.pos.y)/(position[0]-m.pos.x)
+        if (tan < best_tan or (tan == best_tan and position[0] < best[0])):
+            best = position
+            best_tan = tan
+    return grid.sector(best, m.pos)
+
+#   Straight Vertex
+#   Vertices with a 180 degree angle have zero area, which
+#   breaks the ear clipping, but can be unlinked without changing the shape
+
+def _straight(vertex):
+    vertex.update_area()
+    return vertex.area == 0 and (vertex.prev.pos-vertex.pos).dot(vertex.next.pos-vertex.pos) < 0
+
+#   Bridge Holes
+#   Connects each hole to the outer boundary with a bridge edge,
+#   returning a single Polygon that can go through graham_decomposition.
+#   The two vertices of each bridge are duplicated on the merged polygon.
+#   The outer ring is reversed if needed, so convex vertices have positive area
+#   (counter-clockwise on screen), and holes are oriented against it.
+#   Holes are merged from right to left, so each ray only hits
+#   the outer ring or holes already merged into it.
+
+def bridge_holes(points, holes):
+    # Orient the outer ring as Polygon expects, and holes against it
+    if (signed_area(points) < 0):
+        points = list(reversed(points))
+    if (not holes):
+        return Polygon(points)
+    holes = [list(hole) if (signed_area(hole) < 0) else list(reversed(hole)) for hole in holes]
+
+    outer = _ring(points)
+    grid = _Grid(list(points) + [point for hole in holes for point in hole])
+    for vertex in outer:
+        grid.insert(vertex)
+        grid.add(vertex)
+
+    # Rightmost vertex of each hole, sorted by x (descending)
+    rings = []
+    for hole in holes:
+        ring = _ring(hole)
+        rings.append((max(ring, key=lambda v: (v.pos.x, v.pos.y)), ring))
+    rings.sort(key=lambda r: (r[0].pos.x, r[0].pos.y), reverse=True)
+
+    bridges = []
+    for m, ring in rings:
+        p = _find_bridge(grid, m)
+
+        # Splice: ... p -> m -> (hole) -> m2 -> p2 -> ...
+        m2 = Vertex((m.pos.x, m.pos.y))
+        p2 = Vertex((p.pos.x, p.pos.y))
+        p_next = p.next
+        m_prev = m.prev
+        p.next = m
+        m.prev = p
+        m_prev.next = m2
+        m2.prev = m_prev
+        m2.next = p2
+        p2.prev = m2
+        p2.next = p_next
+        p_next.prev = p2
+
+        # Index new edges, and the hole positions (with m now after p)
+        for vertex in ring + [p, m2, p2]:
+            grid.insert(vertex)
+        for vertex in ring + [m2, p2]:
+            grid.add(vertex)
+        bridges += [m, m2, p, p2]
+
+    # Unlink bridge vertices left collinear with their neighbours
+    start = outer[0]
+    for vertex in bridges:
+        if (_straight(vertex)):
+            vertex.prev.next = vertex.next
+            vertex.next.prev = vertex.prev
+            if (vertex == start): start = vertex.next
+
+    # Walk the merged ring
+    merged = []
+    it = start
+    while (True):
+        merged.append((it.pos.x, it.pos.y))
+        it = it.next
+        if (it == start): break
+    return Polygon(merged)
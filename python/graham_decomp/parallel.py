@@ -0,0 +1,277 @@
+##
+#   Graham Decomposition of Polygons
+#   https://github.com/hugoaboud/graham-polygon-decomposition
+#
+#   parallel.py - Divide and Conquer Parallel Decomposition
+##
+
+import queue, time
+from multiprocessing import Pool, cpu_count
+
+from graham_decomp.polygon import Triangle, signed_area
+from graham_decomp.decomp import graham_decomposition, indexed_decomposition
+
+# Smallest piece worth sending to a worker process
+MIN_PIECE = 64
+# Start vertices sampled when looking for a splitting diagonal
+SPLIT_STARTS = 8
+# End vertices sampled (on each side of the opposite vertex) per start
+SPLIT_SAMPLES = 8
+# Maximum number of full O(n) diagonal checks per split
+SPLIT_ATTEMPTS = 32
+# Seconds to wait for a piece of n vertices, from the moment it starts running:
+# PIECE_TIMEOUT + PIECE_TIMEOUT_N2*n*n (graham_decomposition may never return on some inputs)
+PIECE_TIMEOUT = 10
+PIECE_TIMEOUT_N2 = 1e-5
+
+#   Cross product of (a-o) and (b-o)
+#   Same sign convention as Vertex.update_area: positive on convex vertices
+
+def _cross(o, a, b):
+    return (a[0]-o[0])*(b[1]-o[1]) - (a[1]-o[1])*(b[0]-o[0])
+
+#   Segment intersection test
+#   Touching and collinear overlapping segments count as intersecting
+
+def _on_segment(a, b, p):
+    return (min(a[0],b[0]) <= p[0] <= max(a[0],b[0]) and
+            min(a[1],b[1]) <= p[1] <= max(a[1],b[1]))
+
+def _intersects(a, b, c, d):
+    d1 = _cross(a, b, c)
+    d2 = _cross(a, b, d)
+    d3 = _cross(c, d, a)
+    d4 = _cross(c, d, b)
+    if (((d1 > 0 and d2 < 0) or (d1 < 0 and d2 > 0)) and
+        ((d3 > 0 and d4 < 0) or (d3 < 0 and d4 > 0))):
+        return True
+    return ((d1 == 0 and _on_segment(a, b, c)) or
+            (d2 == 0 and _on_segment(a, b, d)) or
+            (d3 == 0 and _on_segment(c, d, a)) or
+            (d4 == 0 and _on_segment(c, d, b)))
+
+#   In Cone
+#   Checks if the diagonal (ring[i] -> p) starts inside the polygon,
+#   that is, between the edges of vertex ring[i]
+
+def _in_cone(points, ring, i, p):
+    a = points[ring[i]]
+    prev = points[ring[i-1]]
+    next = points[ring[(i+1)%len(ring)]]
+    # Convex vertex: diagonal must be strictly inside the wedge
+    if (_cross(a, prev, next) >= 0):
+        return _cross(a, prev, p) > 0 and _cross(a, p, next) > 0
+    # Reflex vertex: diagonal must not be inside the outer wedge
+    return not (_cross(a, next, p) >= 0 and _cross(a, p, prev) >= 0)
+
+#   Clear Diagonal
+#   Checks if (ring[i] -> ring[j]) crosses no polygon edge: O(n)
+#   Together with _in_cone on both ends, it's a valid interior diagonal
+
+def _clear(points, ring, i, j):
+    a = points[ring[i]]
+    b = points[ring[j]]
+    # Diagonal bounding box, to skip far away edges
+    x0, x1 = min(a[0],b[0]), max(a[0],b[0])
+    y0, y1 = min(a[1],b[1]), max(a[1],b[1])
+    n = len(ring)
+    for k in range(n):
+        l = (k+1)%n
+        if (k == i or k == j or l == i or l == j): continue
+        c = points[ring[k]]
+        d = points[ring[l]]
+        if ((c[0] < x0 and d[0] < x0) or (c[0] > x1 and d[0] > x1) or
+            (c[1] < y0 and d[1] < y0) or (c[1] > y1 and d[1] > y1)):
+            continue
+        if (_intersects(a, b, c, d)):
+            return False
+    return True
+
+#   Balanced Split
+#   Cuts a ring of vertex indices in two along a valid interior diagonal,
+#   trying to keep both halves balanced by vertex and reflex count.
+#   Returns None if no valid diagonal was found.
+
+def _split(points, ring):
+    n = len(ring)
+
+    # Cumulative reflex count along the ring
+    reflexes = [0]
+    for i in range(n):
+        prev = points[ring[i-1]]
+        next = points[ring[(i+1)%n]]
+        reflexes.append(reflexes[-1] + (_cross(points[ring[i]], prev, next) < 0))
+    total = max(reflexes[-1], 1)
+
+    # Candidate diagonals, sampled around the vertex opposite to each start
+    step = max(1, n//(4*SPLIT_SAMPLES))
+    candidates = []
+    for s in range(SPLIT_STARTS):
+        i = (s*n)//(2*SPLIT_STARTS)
+        for o in range(-SPLIT_SAMPLES, SPLIT_SAMPLES+1):
+            j = i + n//2 + o*step
+            # Both halves must keep at least 3 vertices
+            if (j-i < 2 or n-(j-i) < 2 or j >= n): continue
+            # Imbalance of the half (i..j), in vertices and reflexes
+            size = j-i+1
+            reflex = reflexes[j]-reflexes[i+1]
+            score = abs(2*size-n)/n + abs(2*reflex-reflexes[-1])/total
+            candidates.append((score, i, j))
+    candidates.sort()
+
+    # Test candidates from best to worst balance
+    # The in cone test is cheap, only the edge scan counts as an attempt
+    attempts = 0
+    for score, i, j in candidates:
+        if (not _in_cone(points, ring, i, points[ring[j]])): continue
+        if (not _in_cone(points, ring, j, points[ring[i]])): continue
+        if (_clear(points, ring, i, j)):
+            return ring[i:j+1], ring[j:] + ring[:i+1]
+        attempts += 1
+        if (attempts == SPLIT_ATTEMPTS): break
+
+    return None
+
+#   Worker
+#   Decomposes a single piece, returning triangles as
+#   tuples of indices on the piece point list,
+#   or None if the decomposition failed
+
+def _decompose(points):
+    try:
+        return indexed_decomposition(points)
+    except Exception:
+        return None
+
+#   Piece
+#   Node of the tree of cuts, so a failed piece can
+#   fall back to its parent (the piece before the cut)
+
+class _Piece:
+
+    def __init__(self, ring, parent=None):
+        self.ring = ring
+        self.parent = parent
+        self.children = []
+        self.triangles = None
+
+    def leaves(self):
+        if (not self.children):
+            return [self]
+        return [leaf for child in self.children for leaf in child.leaves()]
+
+#   Parallel Graham Decomposition
+#   Recursively cuts the polygon into pieces along interior diagonals,
+#   triangulates the pieces on a pool of worker processes
+#   and maps the triangles back to the original polygon vertices.
+#   Each piece of n vertices gets timeout + PIECE_TIMEOUT_N2*n*n seconds
+#   (timeout defaults to PIECE_TIMEOUT), counted from when a worker picks it up.
+#   If a piece fails or runs out of time, the cut that created it is undone
+#   and its parent piece is decomposed instead, down to the whole polygon,
+#   which raises RuntimeError if it fails as well.
+#   A polygon that isn't cut is decomposed in the calling process,
+#   without a time limit, unless timeout is given.
+#   Since it uses multiprocessing, callers should be guarded
+#   by if __name__ == '__main__' on platforms that spawn processes.
+
+def parallel_decomposition(polygon, pieces=None, processes=None, min_piece=MIN_PIECE, timeout=None):
+
+    # Default number of pieces: one per worker
+    if (not processes):
+        processes = cpu_count()
+    if (not pieces):
+        pieces = processes
+
+    # Orient so convex vertices have positive area, as _split expects
+    points = [(vertex.pos.x, vertex.pos.y) for vertex in polygon.vertices]
+    n = len(points)
+    reverse = signed_area(points) < 0
+    if (reverse):
+        points = points[::-1]
+
+    # Split the largest piece until there are enough of them
+    root = _Piece(list(range(n)))
+    leaves = [root]
+    unsplittable = []
+    while (len(leaves) and len(leaves)+len(unsplittable) < pieces):
+        piece = max(leaves, key=lambda piece: len(piece.ring))
+        if (len(piece.ring) < 2*min_piece): break
+        leaves.remove(piece)
+        halves = _split(points, piece.ring)
+        if (halves):
+            piece.children = [_Piece(half, piece) for half in halves]
+            leaves += piece.children
+        else:
+            unsplittable.append(piece)
+
+    # Nothing to parallelize, decompose in place
+    if (not root.children and timeout is None):
+        root.triangles = _decompose(points)
+        if (root.triangles is None):
+            raise RuntimeError("graham_decomposition failed on the polygon")
+    else:
+        _run(root, points, min(processes, len(root.leaves())), PIECE_TIMEOUT if timeout is None else timeout)
+
+    # Stitch triangles back to the original vertex numbering
+    vertices = polygon.vertices[::-1] if reverse else polygon.vertices
+    triangles = []
+    for piece in root.leaves():
+        for a, b, c in piece.triangles:
+            triangles.append(Triangle(vertices[piece.ring[a]], vertices[piece.ring[b]], vertices[piece.ring[c]]))
+
+    return triangles
+
+#   Run Pieces
+#   Decomposes the leaves of the tree on a pool of processes workers.
+#   Only one piece per worker is submitted at a time, so a piece
+#   isn't charged for the time it would spend queued behind others.
+
+def _run(root, points, processes, timeout):
+    done = queue.Queue()
+    running = {}
+    pool = Pool(processes)
+
+    def submit(piece):
+        # Pool callbacks run on its result thread
+        pool.apply_async(_decompose, ([points[k] for k in piece.ring],),
+                         callback=lambda triangles: done.put((piece, triangles)),
+                         error_callback=lambda error: done.put((piece, None)))
+        running[piece] = time.monotonic() + timeout + PIECE_TIMEOUT_N2*len(piece.ring)**2
+
+    def fail(piece):
+        # Undo the cut, the parent becomes a pending leaf
+        if (not piece.parent):
+            raise RuntimeError("graham_decomposition failed on the polygon")
+        piece.parent.children = []
+
+    try:
+        while (True):
+            for piece in root.leaves():
+                if (len(running) == processes): break
+                if (piece.triangles is None and piece not in running):
+                    submit(piece)
+            if (not running): break
+
+            try:
+                piece, triangles = done.get(timeout=max(0, min(running.values())-time.monotonic()))
+            except queue.Empty:
+                # A hung worker never returns: replace the pool, failing the pieces
+                # out of time and submitting the others again
+                now = time.monotonic()
+                hung = [piece for piece, deadline in running.items() if deadline <= now]
+                pool.terminate()
+                pool = Pool(processes)
+                running.clear()
+                for piece in hung:
+                    fail(piece)
+                continue
+
+            # Results of a replaced pool are ignored
+            if (piece not in running): continue
+            del running[piece]
+            # Pieces of an undone cut may still finish, it's harmless
+            piece.triangles = triangles
+            if (triangles is None):
+                fail(piece)
+    finally:
+        pool.terminate()
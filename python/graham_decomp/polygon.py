@@ -7,6 +7,16 @@
 
 from graham_decomp.vector import Vector
 
+# Signed Area (doubled)
+# Same formula as Polygon.reset, without abs:
+# positive when convex vertices have positive area
+
+def signed_area(points):
+    area = 0
+    for p in range(len(points)):
+        area += (points[p-1][0]+points[p][0]) * (points[p-1][1]-points[p][1])
+    return area
+
 # Vertex
 # Item from vertices doubly-linked circular list
 
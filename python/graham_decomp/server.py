@@ -0,0 +1,499 @@
+##
+#   Graham Decomposition of Polygons
+#   https://github.com/hugoaboud/graham-polygon-decomposition
+#
+#   server.py - Asyncio Triangulation Service
+#
+#   Serves graham_decomposition over a Unix socket or HTTP, coalescing
+#   concurrent requests into batches for a warm pool of worker processes.
+#
+#   python -m graham_decomp.server --unix /tmp/graham.sock
+#   python -m graham_decomp.server --http 127.0.0.1:8080
+##
+
+import argparse, asyncio, json, math, struct
+from collections import deque
+from itertools import chain
+from multiprocessing import Pool
+from os import cpu_count
+
+from graham_decomp.decomp import indexed_decomposition
+from graham_decomp.parallel import PIECE_TIMEOUT_N2
+
+#
+# Binary Framing (little-endian)
+#
+# Request:  kind (u8), id (u32), deadline in ms (u32, 0 = none), vertex count (u32),
+#           followed by the vertices as x, y pairs (f64)
+# Response: id (u32), status (u8), payload size (u32), followed by the payload:
+#           triangles as vertex index triples (u32) for STATUS_OK,
+#           JSON for KIND_METRICS and an utf-8 message for errors
+#           (STATUS_TIMEOUT: the decomposition didn't finish, a server error)
+#
+# Over HTTP, the same frames are the body of POST /triangulate.
+# GET /metrics returns the metrics JSON.
+#
+
+REQUEST = struct.Struct('<BIII')
+RESPONSE = struct.Struct('<IBI')
+
+KIND_TRIANGULATE = 0
+KIND_METRICS = 1
+
+STATUS_OK = 0
+STATUS_OVERLOADED = 1
+STATUS_DEADLINE = 2
+STATUS_ERROR = 3
+STATUS_TIMEOUT = 4
+
+HTTP_STATUS = {STATUS_OK: '200 OK', STATUS_OVERLOADED: '503 Service Unavailable',
+               STATUS_DEADLINE: '504 Gateway Timeout', STATUS_ERROR: '400 Bad Request',
+               STATUS_TIMEOUT: '500 Internal Server Error'}
+
+# Largest polygon accepted in a single request
+MAX_VERTICES = 1 << 20
+
+#   Check Polygon
+#   Cheap checks run on the event loop, the rest of validate_polygon
+#   (repeated vertices, zero area) runs on the worker
+
+def _check_polygon(points):
+    if (not 3 <= len(points) <= MAX_VERTICES):
+        raise ValueError("polygon with %d vertices" % len(points))
+    # A finite sum means every coordinate is finite, unless it overflowed
+    if (not math.isfinite(sum(chain.from_iterable(points))) and
+        not all(map(math.isfinite, chain.from_iterable(points)))):
+        raise ValueError("non-finite vertex")
+
+def pack_request(id, points, deadline=0, kind=KIND_TRIANGULATE):
+    coords = [c for point in points for c in point]
+    return REQUEST.pack(kind, id, deadline, len(points)) + struct.pack('<%dd' % len(coords), *coords)
+
+def unpack_request(data):
+    kind, id, deadline, n = REQUEST.unpack_from(data)
+    coords = struct.unpack_from('<%dd' % (2*n), data, REQUEST.size)
+    return kind, id, deadline, list(zip(coords[0::2], coords[1::2]))
+
+async def read_request(reader):
+    header = await reader.readexactly(REQUEST.size)
+    n = REQUEST.unpack(header)[3]
+    if (n > MAX_VERTICES):
+        raise ValueError("request with %d vertices" % n)
+    return unpack_request(header + await reader.readexactly(16*n))
+
+def pack_response(id, status, payload=b''):
+    return RESPONSE.pack(id, status, len(payload)) + payload
+
+async def read_response(reader):
+    id, status, size = RESPONSE.unpack(await reader.readexactly(RESPONSE.size))
+    return id, status, await reader.readexactly(size)
+
+def pack_triangles(triangles):
+    indices = [i for triangle in triangles for i in triangle]
+    return struct.pack('<%dI' % len(indices), *indices)
+
+def unpack_triangles(payload):
+    indices = struct.unpack('<%dI' % (len(payload)//4), payload)
+    return list(zip(indices[0::3], indices[1::3], indices[2::3]))
+
+#
+# Worker Process
+#
+
+def _warmup():
+    # Triangulate a small concave polygon, so the first request
+    # doesn't pay for imports and code paths being loaded
+    indexed_decomposition([(530, 484), (641, 415), (670, 278), (578, 126), (456, 104), (365, 197),
+                           (285, 117), (133, 150), (75, 250), (120, 366), (227, 457), (368, 381)])
+
+def _triangulate_batch(batch):
+    results = []
+    for points in batch:
+        try:
+            results.append((STATUS_OK, indexed_decomposition(points)))
+        except Exception as e:
+            results.append((STATUS_ERROR, str(e) or repr(e)))
+    return results
+
+# Raised on batches left running on a pool that was replaced
+class _Restarted(Exception):
+    pass
+
+#
+# Metrics
+#
+
+class Metrics:
+
+    def __init__(self, window=4096):
+        self.requests = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched = 0
+        # Worker pools replaced after a batch timed out
+        self.restarts = 0
+        # Latency of the last requests, in seconds
+        self.latencies = deque(maxlen=window)
+
+    def percentile(self, p):
+        if (not len(self.latencies)): return 0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies)-1, int(p*len(latencies)))]
+
+    def snapshot(self, queue_depth, inflight):
+        return {
+            'queue_depth': queue_depth,
+            'inflight_batches': inflight,
+            'requests': self.requests,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'expired': self.expired,
+            'errors': self.errors,
+            'batches': self.batches,
+            'restarts': self.restarts,
+            'avg_batch': self.batched/self.batches if self.batches else 0,
+            'latency_ms': {
+                'p50': self.percentile(0.5)*1000,
+                'p90': self.percentile(0.9)*1000,
+                'p99': self.percentile(0.99)*1000,
+            }
+        }
+
+#
+# Service
+#
+
+class Service:
+
+    def __init__(self, processes=None, max_batch=64, max_vertices=4096, linger=0.002, max_queue=1024, max_pending=64,
+                 batch_timeout=10):
+        self.processes = processes or cpu_count()
+        # A batch is dispatched when it reaches max_batch polygons or
+        # max_vertices vertices, or linger seconds after its first polygon
+        self.max_batch = max_batch
+        self.max_vertices = max_vertices
+        self.linger = linger
+        # Requests waiting for a batch, above this new ones are rejected
+        self.max_queue = max_queue
+        # Requests per connection being processed, above this the connection isn't read
+        self.max_pending = max_pending
+        # Seconds a batch may run before its worker is considered hung, plus
+        # PIECE_TIMEOUT_N2*n*n for each polygon of n vertices on it
+        # (graham_decomposition may never return on some inputs, e.g. self-intersecting)
+        self.batch_timeout = batch_timeout
+        self.metrics = Metrics()
+        self.pool = None
+        self.queue = deque()
+        self.ready = None
+        self.slots = None
+        self.inflight = 0
+        # Futures of the batches running on the current pool
+        self.running = set()
+        self.batcher = None
+
+    async def start(self):
+        self.pool = Pool(self.processes, initializer=_warmup)
+        self.ready = asyncio.Event()
+        # One batch per worker, the rest waits on the queue
+        self.slots = asyncio.Semaphore(self.processes)
+        self.batcher = asyncio.ensure_future(self._batch_loop())
+
+    async def close(self):
+        if (self.batcher):
+            self.batcher.cancel()
+        if (self.pool):
+            # Workers may be hung, don't wait for them
+            await asyncio.get_running_loop().run_in_executor(None, self.pool.terminate)
+            self.pool = None
+
+    #   Triangulate
+    #   Returns (status, triangles) or (status, error message)
+
+    async def triangulate(self, points, deadline=None):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        self.metrics.requests += 1
+        # Reject malformed polygons before they reach a worker
+        try:
+            _check_polygon(points)
+        except ValueError as e:
+            self.metrics.errors += 1
+            return STATUS_ERROR, str(e)
+
+        # Backpressure: drop expired requests, then reject if still full
+        if (len(self.queue) >= self.max_queue):
+            self.queue = deque(item for item in self.queue if not item[1].done())
+        if (len(self.queue) >= self.max_queue):
+            self.metrics.rejected += 1
+            return STATUS_OVERLOADED, "queue is full"
+        future = loop.create_future()
+        self.queue.append((points, future))
+        self.ready.set()
+
+        # On timeout, the future is cancelled and the batcher skips it
+        try:
+            status, result = await asyncio.wait_for(future, deadline)
+        except asyncio.TimeoutError:
+            self.metrics.expired += 1
+            return STATUS_DEADLINE, "deadline exceeded"
+
+        if (status == STATUS_OK):
+            self.metrics.completed += 1
+            self.metrics.latencies.append(loop.time()-start)
+        else:
+            self.metrics.errors += 1
+        return status, result
+
+    #   Next queued request, skipping expired ones
+    #   Waits until the loop time end (forever if None), then raises TimeoutError
+
+    async def _get(self, end=None):
+        loop = asyncio.get_running_loop()
+        while (True):
+            while (len(self.queue)):
+                item = self.queue.popleft()
+                if (not item[1].done()): return item
+            self.ready.clear()
+            if (end is None):
+                await self.ready.wait()
+            else:
+                await asyncio.wait_for(self.ready.wait(), max(0, end-loop.time()))
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while (True):
+            # Wait for a free worker, so requests pile up on the queue meanwhile
+            await self.slots.acquire()
+            batch = [await self._get()]
+            size = len(batch[0][0])
+            # Coalesce requests arriving in the next linger seconds
+            end = loop.time()+self.linger
+            while (len(batch) < self.max_batch and size < self.max_vertices):
+                try:
+                    item = await self._get(end)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        self.inflight += 1
+        try:
+            # Skip requests that already expired
+            batch = [item for item in batch if not item[1].done()]
+            if (not len(batch)): return
+            self.metrics.batches += 1
+            self.metrics.batched += len(batch)
+            try:
+                results = await self._dispatch(batch)
+            except Exception as e:
+                results = [(STATUS_ERROR, repr(e))]*len(batch)
+            for (_, future), result in zip(batch, results):
+                if (not future.done()):
+                    future.set_result(result)
+        finally:
+            self.inflight -= 1
+            self.slots.release()
+
+    #   Submit
+    #   Sends a batch to the pool, returning a future for its results
+
+    def _submit(self, polygons):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def settle(result, error):
+            if (future.done()): return
+            if (error): future.set_exception(error)
+            else: future.set_result(result)
+
+        # Pool callbacks run on its result thread
+        self.pool.apply_async(_triangulate_batch, (polygons,),
+                              callback=lambda result: loop.call_soon_threadsafe(settle, result, None),
+                              error_callback=lambda error: loop.call_soon_threadsafe(settle, None, error))
+        self.running.add(future)
+        future.add_done_callback(self.running.discard)
+        return future
+
+    #   Dispatch
+    #   Runs a batch of (points, future) on the pool under the watchdog: if it doesn't
+    #   finish within its timeout, the pool is replaced and its polygons are retried
+    #   one by one, so only the polygon that hangs fails.
+    #   Requests whose future is done (expired) are never run again, their result is None.
+
+    async def _dispatch(self, batch):
+        results = [None]*len(batch)
+        while (True):
+            live = [i for i, (_, future) in enumerate(batch) if not future.done()]
+            if (not live): return results
+            polygons = [batch[i][0] for i in live]
+            timeout = self.batch_timeout + PIECE_TIMEOUT_N2*sum(len(points)**2 for points in polygons)
+            try:
+                for i, result in zip(live, await asyncio.wait_for(self._submit(polygons), timeout)):
+                    results[i] = result
+                return results
+            except _Restarted:
+                # Another batch replaced the pool, run again on the new one
+                continue
+            except asyncio.TimeoutError:
+                await self._restart()
+            if (len(live) == 1):
+                results[live[0]] = (STATUS_TIMEOUT, "decomposition timed out")
+                return results
+            for i in live:
+                results[i] = (await self._dispatch([batch[i]]))[0]
+            return results
+
+    #   Restart
+    #   Replaces the pool, killing its workers
+
+    async def _restart(self):
+        self.metrics.restarts += 1
+        pool = self.pool
+        self.pool = Pool(self.processes, initializer=_warmup)
+        for future in list(self.running):
+            if (not future.done()):
+                future.set_exception(_Restarted())
+        await asyncio.get_running_loop().run_in_executor(None, pool.terminate)
+
+    #   Handle
+    #   Answers a decoded request frame with a response frame
+
+    async def handle(self, kind, id, deadline, points):
+        if (kind == KIND_METRICS):
+            return pack_response(id, STATUS_OK, json.dumps(self.snapshot()).encode())
+        if (kind != KIND_TRIANGULATE):
+            return pack_response(id, STATUS_ERROR, b"unknown request kind")
+        status, result = await self.triangulate(points, deadline/1000 if deadline else None)
+        if (status == STATUS_OK):
+            return pack_response(id, status, pack_triangles(result))
+        return pack_response(id, status, result.encode())
+
+    def snapshot(self):
+        queued = sum(1 for item in self.queue if not item[1].done())
+        return self.metrics.snapshot(queued, self.inflight)
+
+    #   Stream Connection (Unix socket)
+    #   Requests are pipelined and answered as they complete, matched by id
+
+    async def serve_stream(self, reader, writer):
+        pending = asyncio.Semaphore(self.max_pending)
+        tasks = set()
+
+        async def respond(request):
+            try:
+                writer.write(await self.handle(*request))
+                await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                pending.release()
+
+        try:
+            while (True):
+                # Stop reading while too many requests are pending
+                await pending.acquire()
+                try:
+                    request = await read_request(reader)
+                except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    break
+                task = asyncio.ensure_future(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if (tasks):
+                await asyncio.wait(tasks)
+        finally:
+            writer.close()
+
+    #   HTTP Connection
+    #   Minimal HTTP/1.1 with keep-alive, one request at a time
+
+    async def serve_http(self, reader, writer):
+        try:
+            while (True):
+                line = await reader.readline()
+                if (not line): break
+                method, path = line.decode('latin-1').split(' ')[:2]
+                headers = {}
+                while (True):
+                    line = await reader.readline()
+                    if (line in (b'\r\n', b'\n', b'')): break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if (length > REQUEST.size+16*MAX_VERTICES): break
+                body = await reader.readexactly(length)
+
+                if (method == 'GET' and path == '/metrics'):
+                    status = '200 OK'
+                    content_type = 'application/json'
+                    payload = json.dumps(self.snapshot()).encode()
+                elif (method == 'POST' and path == '/triangulate'):
+                    content_type = 'application/octet-stream'
+                    try:
+                        payload = await self.handle(*unpack_request(body))
+                        status = HTTP_STATUS[RESPONSE.unpack_from(payload)[1]]
+                    except struct.error:
+                        status = '400 Bad Request'
+                        payload = b''
+                else:
+                    status = '404 Not Found'
+                    content_type = 'text/plain'
+                    payload = b''
+
+                writer.write(('HTTP/1.1 %s\r\nContent-Type: %s\r\nContent-Length: %d\r\n\r\n' %
+                              (status, content_type, len(payload))).encode('latin-1') + payload)
+                await writer.drain()
+                if (headers.get('connection', '').lower() == 'close'): break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+#   Serve
+#   Runs the service on a Unix socket and/or HTTP until cancelled
+
+async def serve(service, unix=None, http=None):
+    await service.start()
+    servers = []
+    try:
+        if (unix):
+            servers.append(await asyncio.start_unix_server(service.serve_stream, unix))
+        if (http):
+            host, port = http.rsplit(':', 1)
+            servers.append(await asyncio.start_server(service.serve_http, host, int(port)))
+        await asyncio.gather(*[server.serve_forever() for server in servers])
+    finally:
+        for server in servers:
+            server.close()
+        await service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Graham decomposition triangulation service")
+    parser.add_argument('--unix', help="Unix socket path")
+    parser.add_argument('--http', help="host:port to serve HTTP on")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: cpu count)")
+    parser.add_argument('--max-batch', type=int, default=64, help="polygons per batch")
+    parser.add_argument('--max-vertices', type=int, default=4096, help="vertices per batch")
+    parser.add_argument('--linger-ms', type=float, default=2, help="time to wait for a batch to fill")
+    parser.add_argument('--max-queue', type=int, default=1024, help="queued requests before rejecting")
+    parser.add_argument('--batch-timeout', type=float, default=10,
+                        help="seconds before a batch is considered hung, plus %g*n*n per polygon" % PIECE_TIMEOUT_N2)
+    args = parser.parse_args()
+    if (not args.unix and not args.http):
+        parser.error("either --unix or --http is required")
+
+    service = Service(args.processes, args.max_batch, args.max_vertices, args.linger_ms/1000, args.max_queue,
+                      batch_timeout=args.batch_timeout)
+    try:
+        asyncio.run(serve(service, args.unix, args.http))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
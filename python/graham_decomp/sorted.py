@@ -59,7 +59,8 @@ def search_avg_area(areas, total):
         if (value <= areas[i].area): s = i
         else: e = i
     # return vertex with smaller area ratio to the average
-    if (e == len(areas) or (areas[s].area/value < value/areas[e].area)):
+    # (areas[s]/value < value/areas[e], without dividing by straight vertices)
+    if (e == len(areas) or (areas[s].area*areas[e].area < value*value)):
         # additional rule:
         # if largest face is greater than average, return second largest
         if (s == 0 and areas[0].area > value):
@@ -0,0 +1,148 @@
+##
+#   Graham Decomposition of Polygons
+#   https://github.com/hugoaboud/graham-polygon-decomposition
+#
+#   loadgen.py - Load generator for the triangulation service
+#
+#   python loadgen.py --unix /tmp/graham.sock --concurrency 64 --duration 10
+#   python loadgen.py --http 127.0.0.1:8080 --concurrency 16 --vertices 200
+##
+
+import argparse, asyncio, json, math, random, time
+
+from graham_decomp import server
+
+#   Random Polygon
+#   Star-shaped polygon, with every other vertex pulled inwards
+#   (oriented so convex vertices have positive area)
+
+def random_polygon(n, rng):
+    points = []
+    for i in range(n):
+        angle = -2*math.pi*(i+rng.random()*0.5)/n
+        radius = 100 if (i%2) else rng.uniform(80, 100)
+        points.append((500+radius*math.cos(angle), 500+radius*math.sin(angle)))
+    return points
+
+#   Connections
+#   Both expose request(frame) -> response frame (id, status, payload)
+
+class UnixConnection:
+
+    async def open(self, path):
+        self.reader, self.writer = await asyncio.open_unix_connection(path)
+        self.waiting = {}
+        self.receiver = asyncio.ensure_future(self._receive())
+
+    async def _receive(self):
+        while (True):
+            response = await server.read_response(self.reader)
+            self.waiting.pop(response[0]).set_result(response)
+
+    async def request(self, id, frame):
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[id] = future
+        self.writer.write(frame)
+        await self.writer.drain()
+        return await future
+
+    def close(self):
+        self.receiver.cancel()
+        self.writer.close()
+
+class HTTPConnection:
+
+    async def open(self, address):
+        host, port = address.rsplit(':', 1)
+        self.host = address
+        self.reader, self.writer = await asyncio.open_connection(host, int(port))
+        self.lock = asyncio.Lock()
+
+    async def http(self, method, path, body=b''):
+        async with self.lock:
+            self.writer.write(('%s %s HTTP/1.1\r\nHost: %s\r\nContent-Length: %d\r\n\r\n' %
+                               (method, path, self.host, len(body))).encode('latin-1') + body)
+            await self.writer.drain()
+            await self.reader.readline()
+            length = 0
+            while (True):
+                line = await self.reader.readline()
+                if (line in (b'\r\n', b'')): break
+                key, _, value = line.decode('latin-1').partition(':')
+                if (key.strip().lower() == 'content-length'):
+                    length = int(value)
+            return await self.reader.readexactly(length)
+
+    async def request(self, id, frame):
+        payload = await self.http('POST', '/triangulate', frame)
+        id, status, size = server.RESPONSE.unpack_from(payload)
+        return id, status, payload[server.RESPONSE.size:]
+
+    def close(self):
+        self.writer.close()
+
+#   Client
+#   Sends polygons back to back until the end time, recording latencies
+
+async def client(connection, args, end, stats, seed):
+    rng = random.Random(seed)
+    polygons = [random_polygon(args.vertices, rng) for _ in range(16)]
+    id = seed << 20
+    while (time.perf_counter() < end):
+        id += 1
+        points = polygons[id%len(polygons)]
+        start = time.perf_counter()
+        _, status, payload = await connection.request(id, server.pack_request(id, points, args.deadline_ms))
+        stats['latencies'].append(time.perf_counter()-start)
+        stats['status'][status] = stats['status'].get(status, 0)+1
+        if (status == server.STATUS_OK and len(payload)//12 != len(points)-2):
+            stats['invalid'] += 1
+
+async def run(args):
+    connections = []
+    for _ in range(args.connections):
+        connection = UnixConnection() if args.unix else HTTPConnection()
+        await connection.open(args.unix or args.http)
+        connections.append(connection)
+
+    stats = {'latencies': [], 'status': {}, 'invalid': 0}
+    start = time.perf_counter()
+    end = start+args.duration
+    await asyncio.gather(*[client(connections[c%len(connections)], args, end, stats, c+1) for c in range(args.concurrency)])
+    elapsed = time.perf_counter()-start
+
+    # Server side metrics
+    if (args.unix):
+        _, _, payload = await connections[0].request(0, server.pack_request(0, [], kind=server.KIND_METRICS))
+    else:
+        payload = await connections[0].http('GET', '/metrics')
+    for connection in connections:
+        connection.close()
+
+    latencies = sorted(stats['latencies'])
+    names = {server.STATUS_OK: 'ok', server.STATUS_OVERLOADED: 'overloaded',
+             server.STATUS_DEADLINE: 'deadline', server.STATUS_ERROR: 'error', server.STATUS_TIMEOUT: 'timeout'}
+    print("requests:   %d in %.2fs (%.1f req/s)" % (len(latencies), elapsed, len(latencies)/elapsed))
+    print("status:     " + ", ".join("%s %d" % (names.get(s, s), c) for s, c in sorted(stats['status'].items())))
+    print("invalid:    %d" % stats['invalid'])
+    if (len(latencies)):
+        print("latency ms: p50 %.2f, p90 %.2f, p99 %.2f, max %.2f" % tuple(
+            1000*latencies[min(len(latencies)-1, int(p*len(latencies)))] for p in (0.5, 0.9, 0.99, 1)))
+    print("server:     " + json.dumps(json.loads(payload)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the triangulation service")
+    parser.add_argument('--unix', help="Unix socket path")
+    parser.add_argument('--http', help="host:port of the HTTP server")
+    parser.add_argument('--concurrency', type=int, default=32, help="requests in flight")
+    parser.add_argument('--connections', type=int, default=4, help="connections shared by the clients")
+    parser.add_argument('--duration', type=float, default=5, help="seconds to run")
+    parser.add_argument('--vertices', type=int, default=32, help="vertices per polygon")
+    parser.add_argument('--deadline-ms', type=int, default=0, help="per-request deadline (0 = none)")
+    args = parser.parse_args()
+    if (not args.unix and not args.http):
+        parser.error("either --unix or --http is required")
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
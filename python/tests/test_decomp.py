@@ -0,0 +1,40 @@
+##
+#   Graham Decomposition of Polygons
+#   https://github.com/hugoaboud/graham-polygon-decomposition
+#
+#   test_decomp.py - Graham Decomposition of Concave Polygons
+##
+
+import pytest
+
+from graham_decomp.polygon import Polygon
+from graham_decomp.decomp import graham_decomposition
+
+# Simple polygons with collinear vertices, which used to raise,
+# never return or overlap triangles
+POLYGONS = [
+    # Pivot left straight after slicing a convex subpolygon
+    [(16,11), (14,13), (17,5), (11,16), (16,16)],
+    # Subpolygon closing at exactly 180 degrees
+    [(0,17), (15,18), (14,11), (8,8), (7,14)],
+    # Recursion on a subpolygon whose reflexes were sliced out before
+    [(33,720), (325,417), (453,502), (598,413), (861,22), (651,28),
+     (189,61), (623,172), (142,112), (515,172), (412,458), (22,174)],
+    # Reflex vertex on the diagonal closing a subpolygon
+    [(30,25), (15,15), (19,10), (29,19), (24,5), (24,4), (23,3), (18,0), (23,6), (20,5), (12,2), (5,2),
+     (3,9), (5,12), (6,17), (2,28), (5,25), (1,30), (5,29), (6,19), (9,17), (7,11), (12,17), (16,24)],
+    # Reflex vertex on a 180 degree diagonal, behind the pivot
+    [(4,5), (0,8), (0,16), (1,18), (6,13), (5,15), (5,19), (9,10), (7,6), (11,8), (13,18), (13,19),
+     (11,19), (11,14), (10,17), (10,20), (16,19), (20,15), (14,19), (15,17), (19,15), (16,10),
+     (15,8), (18,11), (12,1), (16,8), (10,4), (9,0), (3,1), (8,1), (3,2), (4,3)],
+    # Straight vertex at the start
+    [(0,0), (0,1), (0,2), (1,1)],
+]
+
+@pytest.mark.parametrize('points', POLYGONS)
+def test_collinear_vertices(points):
+    polygon = Polygon(points)
+    triangles = graham_decomposition(polygon)
+    assert len(triangles) == len(points)-2
+    area = sum(abs((t.b.pos-t.a.pos).cross(t.c.pos-t.a.pos))/2 for t in triangles)
+    assert abs(area-polygon.area) <= 1e-9*polygon.area
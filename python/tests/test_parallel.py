@@ -0,0 +1,83 @@
+##
+#   Graham Decomposition of Polygons
+#   https://github.com/hugoaboud/graham-polygon-decomposition
+#
+#   test_parallel.py - Divide and Conquer Parallel Decomposition
+##
+
+import math, multiprocessing, random
+
+import pytest
+
+from graham_decomp.polygon import Polygon
+from graham_decomp.decomp import graham_decomposition
+from graham_decomp import parallel
+from graham_decomp.parallel import parallel_decomposition, _decompose, _split
+
+# Star-shaped polygon, with every other vertex pulled inwards
+def star(n, seed):
+    rng = random.Random(seed)
+    points = []
+    for i in range(n):
+        angle = -2*math.pi*(i+rng.random()*0.5)/n
+        radius = 400 if (i%2) else rng.uniform(320, 400)
+        points.append((500+radius*math.cos(angle), 500+radius*math.sin(angle)))
+    return points
+
+def triangles_area(triangles):
+    return sum(abs((t.b.pos-t.a.pos).cross(t.c.pos-t.a.pos))/2 for t in triangles)
+
+def check(polygon, triangles):
+    assert len(triangles) == len(polygon.vertices)-2
+    assert abs(triangles_area(triangles)-polygon.area) <= 1e-9*polygon.area
+    vertices = {id(vertex) for vertex in polygon.vertices}
+    assert all(id(v) in vertices for t in triangles for v in (t.a, t.b, t.c))
+
+def test_split_pieces_cover_polygon():
+    points = star(1000, 0)
+    halves = _split(points, list(range(len(points))))
+    assert halves
+    area = lambda ring: Polygon([points[k] for k in ring]).area
+    assert abs(area(halves[0])+area(halves[1])-Polygon(points).area) <= 1e-9*Polygon(points).area
+    assert len(halves[0])+len(halves[1]) == len(points)+2
+
+def test_parallel_matches_polygon():
+    for seed in (0, 1, 4, 5, 11):
+        polygon = Polygon(star(1000, seed))
+        check(polygon, parallel_decomposition(polygon, pieces=8, processes=2, timeout=3))
+
+# Fails pieces below a size, so they fall back to their parents
+# (the patch only reaches workers that are forked)
+def _decompose_large(points):
+    if (len(points) < 300):
+        return None
+    return _decompose(points)
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason="workers don't inherit the patch")
+def test_parallel_falls_back_to_parent(monkeypatch):
+    monkeypatch.setattr(parallel, '_decompose', _decompose_large)
+    polygon = Polygon(star(1000, 0))
+    check(polygon, parallel_decomposition(polygon, pieces=8, processes=2, timeout=3))
+
+def test_parallel_small_polygon_is_serial():
+    polygon = Polygon([(530, 484), (641, 415), (670, 278), (578, 126), (456, 104), (365, 197),
+                       (285, 117), (133, 150), (75, 250), (120, 366), (227, 457), (368, 381)])
+    check(polygon, parallel_decomposition(polygon, processes=2))
+    polygon = Polygon(star(200, 2))
+    check(polygon, parallel_decomposition(polygon, pieces=4, processes=2, min_piece=16, timeout=3))
+
+def test_parallel_clockwise_polygon():
+    polygon = Polygon(star(1000, 1)[::-1])
+    check(polygon, parallel_decomposition(polygon, pieces=4, processes=2, timeout=3))
+
+def test_parallel_timeout_is_per_piece():
+    # 8 pieces on a single worker take longer than timeout,
+    # but none of them should be failed while queued
+    polygon = Polygon(star(2500, 1))
+    check(polygon, parallel_decomposition(polygon, pieces=8, processes=1, timeout=0.5))
+
+def test_parallel_serial_fallback_timeout():
+    # Self-intersecting, graham_decomposition never returns
+    polygon = Polygon([(0,0), (0,2), (3,0), (3,3)])
+    with pytest.raises(RuntimeError):
+        parallel_decomposition(polygon, processes=1, timeout=1)
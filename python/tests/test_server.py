@@ -0,0 +1,125 @@
+##
+#   Graham Decomposition of Polygons
+#   https://github.com/hugoaboud/graham-polygon-decomposition
+#
+#   test_server.py - Asyncio Triangulation Service
+##
+
+import asyncio, math, time
+
+import pytest
+
+from graham_decomp import server
+from graham_decomp.decomp import indexed_decomposition
+
+# Convex vertices with positive area
+SQUARE = [(0,0), (0,1), (1,1), (1,0)]
+CONCAVE = [(530,484), (641,415), (670,278), (578,126), (456,104), (365,197),
+           (285,117), (133,150), (75,250), (120,366), (227,457), (368,381)]
+CONCAVE_AREA = 156216
+# Self-intersecting, graham_decomposition never returns
+BOWTIE = [(0,0), (0,2), (3,0), (3,3)]
+# Takes about a second to decompose
+STAR = [(500+(400 if (i%2) else 300)*math.cos(2*math.pi*i/1000),
+         500+(400 if (i%2) else 300)*math.sin(2*math.pi*i/1000)) for i in range(1000)]
+
+def area(points, triangles):
+    total = 0
+    for a, b, c in triangles:
+        (ax, ay), (bx, by), (cx, cy) = points[a], points[b], points[c]
+        total += abs((bx-ax)*(cy-ay) - (by-ay)*(cx-ax))/2
+    return total
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 60))
+
+async def with_service(test, batch_timeout=1, **kwargs):
+    service = server.Service(processes=1, linger=0.01, batch_timeout=batch_timeout, **kwargs)
+    await service.start()
+    try:
+        return await test(service)
+    finally:
+        start = time.monotonic()
+        await service.close()
+        assert time.monotonic()-start < 5
+
+def test_indexed_decomposition_orientation():
+    for points in (CONCAVE, CONCAVE[::-1]):
+        triangles = indexed_decomposition(points)
+        assert len(triangles) == len(points)-2
+        assert area(points, triangles) == CONCAVE_AREA
+
+@pytest.mark.parametrize('points', [[(0,0), (1,1)], [(0,0), (0,1), (0,2)],
+                                    [(0,0), (0,0), (1,1), (1,0)], [(0,0), (0,float('nan')), (1,0)]])
+def test_indexed_decomposition_degenerate(points):
+    with pytest.raises(ValueError):
+        indexed_decomposition(points)
+
+def test_framing():
+    kind, id, deadline, points = server.unpack_request(server.pack_request(7, CONCAVE, 250))
+    assert (kind, id, deadline, points) == (server.KIND_TRIANGULATE, 7, 250, CONCAVE)
+    triangles = [(0,1,2), (2,3,4)]
+    assert server.unpack_triangles(server.pack_triangles(triangles)) == triangles
+
+def test_reversed_then_valid():
+    async def test(service):
+        for points in (SQUARE[::-1], SQUARE):
+            status, triangles = await service.triangulate(points, 5)
+            assert status == server.STATUS_OK
+            assert len(triangles) == 2 and area(points, triangles) == 1
+        assert service.metrics.restarts == 0
+    run(with_service(test))
+
+@pytest.mark.parametrize('points', [[(0,0), (1,1)], [(0,0), (0,float('nan')), (1,0)],
+                                    [(0,0), (0,float('inf')), (1,0)]])
+def test_malformed_is_rejected(points):
+    async def test(service):
+        status, message = await service.triangulate(points)
+        assert status == server.STATUS_ERROR
+        assert service.metrics.batches == 0
+    run(with_service(test))
+
+def test_degenerate_is_rejected_by_worker():
+    async def test(service):
+        status, message = await service.triangulate([(0,0), (1,1), (2,2)])
+        assert status == server.STATUS_ERROR and "zero area" in message
+        assert service.metrics.batches == 1 and service.metrics.restarts == 0
+    run(with_service(test))
+
+def test_hung_polygon_restarts_pool():
+    async def test(service):
+        # Batched together with valid polygons, only the bow-tie fails
+        results = await asyncio.gather(service.triangulate(SQUARE, 10), service.triangulate(BOWTIE, 10),
+                                       service.triangulate(CONCAVE, 10))
+        assert [status for status, _ in results] == [server.STATUS_OK, server.STATUS_TIMEOUT, server.STATUS_OK]
+        assert service.metrics.restarts >= 1
+        # The worker is usable again
+        status, triangles = await service.triangulate(CONCAVE, 5)
+        assert status == server.STATUS_OK and area(CONCAVE, triangles) == CONCAVE_AREA
+        assert service.snapshot()['inflight_batches'] == 0
+    run(with_service(test))
+
+def test_timeout_scales_with_vertices():
+    async def test(service):
+        status, triangles = await service.triangulate(STAR, 30)
+        assert status == server.STATUS_OK and len(triangles) == len(STAR)-2
+        assert service.metrics.restarts == 0
+    run(with_service(test, batch_timeout=0.2))
+
+def test_expired_requests_are_not_retried():
+    async def test(service):
+        submitted = []
+        submit = service._submit
+        def record(polygons):
+            submitted.append(len(polygons))
+            return submit(polygons)
+        service._submit = record
+        # The other requests expire while the bow-tie hangs, only the bow-tie is retried
+        results = await asyncio.gather(service.triangulate(BOWTIE, 10), service.triangulate(SQUARE, 0.5),
+                                       service.triangulate(CONCAVE, 0.5))
+        assert [status for status, _ in results] == [server.STATUS_TIMEOUT, server.STATUS_DEADLINE,
+                                                     server.STATUS_DEADLINE]
+        assert submitted == [3, 1]
+        # Once for the batch, once for the bow-tie alone
+        assert service.metrics.restarts == 2
+    run(with_service(test))